@@ -70,9 +70,11 @@ function PDFSigner() {
 
       // 3. Sign PDF
       setSigningProgress(60)
-      const signedDoc = await apiService.signPDF(pdfDoc.id, sigDoc.id)
+      const pendingDoc = await apiService.signPDF(pdfDoc.id, sigDoc.id)
+      setSignedDocumentId(pendingDoc.id)
+      setSigningProgress(70)
+      const signedDoc = await apiService.waitForSignedDocument(pendingDoc.id)
       setSigningProgress(80)
-      setSignedDocumentId(signedDoc.id)
 
       // 4. Download Signed PDF for preview/download button
       const blob = await apiService.downloadSignedDocumentBlob(signedDoc.id)
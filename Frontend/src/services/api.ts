@@ -23,11 +23,14 @@ export interface Signature {
   uploaded_at: string
 }
 
+export type SigningStatus = 'pending' | 'completed' | 'failed'
+
 export interface SignedDocument {
   id: string
   original_document: string
   signature: string
-  signed_pdf: string
+  signed_pdf: string | null
+  status: SigningStatus
   signed_at: string
 }
 
@@ -199,7 +202,9 @@ class ApiService {
   }
 
   /**
-   * Sign PDF document with signature
+   * Sign PDF document with signature.
+   * Signing runs in the background on the server; the returned document is
+   * usually still pending, see waitForSignedDocument().
    */
   async signPDF(
     documentId: string,
@@ -233,6 +238,30 @@ class ApiService {
     return response.data
   }
 
+  /**
+   * Poll a signed document until the background signing has finished
+   */
+  async waitForSignedDocument(
+    id: string,
+    { intervalMs = 1000, timeoutMs = 180000 }: { intervalMs?: number; timeoutMs?: number } = {}
+  ): Promise<SignedDocument> {
+    const deadline = Date.now() + timeoutMs
+
+    while (true) {
+      const signedDoc = await this.getSignedDocument(id)
+      if (signedDoc.status === 'completed') {
+        return signedDoc
+      }
+      if (signedDoc.status === 'failed') {
+        throw { message: 'Failed to sign PDF. Please try again.' } as ApiError
+      }
+      if (Date.now() >= deadline) {
+        throw { message: 'Signing is taking longer than expected. Please try again later.' } as ApiError
+      }
+      await new Promise((resolve) => setTimeout(resolve, intervalMs))
+    }
+  }
+
   /**
    * Download signed PDF via API endpoint (FileResponse)
    */
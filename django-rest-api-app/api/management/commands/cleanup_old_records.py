@@ -1,8 +1,12 @@
 import os
 from datetime import timedelta
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Q
 from django.utils import timezone
 from api.models import Document, Signature, SignedDocument
+from api.utils import remove_files
 
 class Command(BaseCommand):
     help = 'Delete Document, Signature, and SignedDocument records older than 3 days'
@@ -10,35 +14,61 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         cutoff = timezone.now() - timedelta(days=3)
 
-        # 1. Delete old SignedDocuments (using signed_at as timestamp)
-        for signed_doc in SignedDocument.objects.filter(signed_at__lt=cutoff):
-            if signed_doc.signed_pdf:
-                path = signed_doc.signed_pdf.path
-                if os.path.isfile(path):
-                    try:
-                        os.remove(path)
-                    except OSError:
-                        pass
-            signed_doc.delete()
-
-        # 2. Delete old Documents
-        for doc in Document.objects.filter(created_at__lt=cutoff):
-            if doc.original_pdf:
-                path = doc.original_pdf.path
-                if os.path.isfile(path):
-                    try:
-                        os.remove(path)
-                    except OSError:
-                        pass
-            doc.delete()
-
-        # 3. Delete old Signatures
-        for sig in Signature.objects.filter(created_at__lt=cutoff):
-            if sig.image_file:
-                path = sig.image_file.path
-                if os.path.isfile(path):
-                    try:
-                        os.remove(path)
-                    except OSError:
-                        pass
-            sig.delete()
+        # order_by() drops the Meta ordering so the DB doesn't sort the result
+        documents = Document.objects.filter(created_at__lt=cutoff).order_by()
+        signatures = Signature.objects.filter(created_at__lt=cutoff).order_by()
+        # The deletes below skip Django's cascade, so also take the signed
+        # documents that still point at an expiring Document or Signature
+        signed_docs = SignedDocument.objects.filter(
+            Q(signed_at__lt=cutoff)
+            | Q(original_document__in=documents)
+            | Q(signature__in=signatures)
+        ).order_by()
+
+        paths = []
+        with transaction.atomic():
+            # Children (SignedDocument) first
+            for queryset, field in (
+                (signed_docs, 'signed_pdf'),
+                (documents, 'original_pdf'),
+                (signatures, 'image_file'),
+            ):
+                paths.extend(self._delete_returning(queryset, field))
+
+        remove_files(os.path.join(settings.MEDIA_ROOT, name) for name in paths if name)
+
+    def _delete_returning(self, queryset, field_name):
+        """
+        Delete the rows in ``queryset`` and return their ``field_name`` values
+        (file paths relative to MEDIA_ROOT).
+
+        None of these models have delete signal receivers, so this issues a
+        plain DELETE rather than going through Django's collector.
+        """
+        connection = connections[queryset.db]
+        if not _can_delete_returning(connection):
+            # MySQL has no DELETE ... RETURNING: lock the rows while reading
+            # the paths so the DELETE removes exactly those rows
+            paths = list(
+                queryset.select_for_update().values_list(field_name, flat=True).iterator(chunk_size=500)
+            )
+            queryset._raw_delete(queryset.db)
+            return paths
+
+        # Remove the rows and read back their paths in a single statement
+        opts = queryset.model._meta
+        qn = connection.ops.quote_name
+        subquery, params = queryset.values('pk').query.sql_with_params()
+        sql = (
+            f"DELETE FROM {qn(opts.db_table)} WHERE {qn(opts.pk.column)} IN ({subquery}) "
+            f"RETURNING {qn(opts.get_field(field_name).column)}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+
+def _can_delete_returning(connection):
+    # PostgreSQL, and SQLite from 3.35 (the same release that added
+    # INSERT ... RETURNING)
+    return connection.vendor in ('postgresql', 'sqlite') and connection.features.can_return_columns_from_insert
@@ -1,23 +1,34 @@
-import os
 from datetime import timedelta
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from api.models import SignedDocument
+from api.utils import remove_files
+
+# Signing jobs run in the web server process and are lost when it restarts;
+# a row still pending after this long will never be completed
+STALE_PENDING_AFTER = timedelta(hours=1)
 
 
 class Command(BaseCommand):
-    help = "Delete signed PDFs older than 3 days."
+    help = "Delete signed PDFs older than 3 days and fail signing jobs that were lost."
 
     def handle(self, *args, **options):
-        cutoff = timezone.now() - timedelta(days=3)
-        queryset = SignedDocument.objects.filter(signed_at__lt=cutoff)
+        now = timezone.now()
+        SignedDocument.objects.filter(
+            status=SignedDocument.STATUS_PENDING,
+            signed_at__lt=now - STALE_PENDING_AFTER,
+        ).update(status=SignedDocument.STATUS_FAILED)
+
+        cutoff = now - timedelta(days=3)
+        # Only fetch the columns used below; order_by() drops the Meta
+        # ordering so the DB doesn't sort the result
+        queryset = SignedDocument.objects.filter(signed_at__lt=cutoff).only('id', 'signed_pdf').order_by()
 
-        for signed_document in queryset.iterator():
-            file_path = signed_document.get_file_path()
-            if file_path and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except OSError:
-                    pass
+        file_paths = []
+        for signed_document in queryset.iterator(chunk_size=500):
+            if signed_document.signed_pdf:
+                file_paths.append(signed_document.get_file_path())
 
             signed_document.delete()
+
+        remove_files(file_paths)
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_alter_document_options_alter_signature_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='document',
+            name='api_documen_created_2fddfd_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='signature',
+            name='api_signatu_created_227857_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='signeddocument',
+            name='api_signedd_signed__e1f105_idx',
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['created_at', 'original_pdf'], name='api_documen_created_ee006c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='signature',
+            index=models.Index(fields=['created_at', 'image_file'], name='api_signatu_created_4c98c3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='signeddocument',
+            index=models.Index(fields=['signed_at', 'signed_pdf'], name='api_signedd_signed__f821ab_idx'),
+        ),
+    ]
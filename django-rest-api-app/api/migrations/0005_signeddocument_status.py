@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:14
+
+import api.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_cleanup_covering_indexes'),
+    ]
+
+    operations = [
+        # Existing rows were signed synchronously, so they are already complete
+        migrations.AddField(
+            model_name='signeddocument',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed')], default='completed', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='signeddocument',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='signeddocument',
+            name='signed_pdf',
+            field=models.FileField(blank=True, upload_to='signed_documents/', validators=[api.validators.validate_pdf_file, api.validators.validate_file_size]),
+        ),
+        migrations.AddIndex(
+            model_name='signeddocument',
+            index=models.Index(fields=['status'], name='api_signedd_status_43fe67_idx'),
+        ),
+    ]
@@ -14,7 +14,10 @@ class Document(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=['created_at']),
+            # On MySQL/InnoDB, where every secondary index also stores the
+            # primary key, this covers cleanup_old_records' lookup of expired
+            # rows and their file paths
+            models.Index(fields=['created_at', 'original_pdf']),
         ]
         ordering = ['-created_at']
 
@@ -39,7 +42,10 @@ class Signature(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=['created_at']),
+            # On MySQL/InnoDB, where every secondary index also stores the
+            # primary key, this covers cleanup_old_records' lookup of expired
+            # rows and their file paths
+            models.Index(fields=['created_at', 'image_file']),
         ]
         ordering = ['-created_at']
 
@@ -55,20 +61,35 @@ class Signature(models.Model):
         return self.image_file.path
 
 class SignedDocument(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     original_document = models.ForeignKey(Document, on_delete=models.CASCADE)
     signature = models.ForeignKey(Signature, on_delete=models.CASCADE)
+    # Empty until the background signing task has written the file
     signed_pdf = models.FileField(
         upload_to='signed_documents/',
+        blank=True,
         validators=[validate_pdf_file, validate_file_size]
     )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
     signed_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         indexes = [
-            models.Index(fields=['signed_at']),
+            # On MySQL/InnoDB, where every secondary index also stores the
+            # primary key, this covers cleanup_signed_pdfs' query
+            models.Index(fields=['signed_at', 'signed_pdf']),
             models.Index(fields=['original_document']),
             models.Index(fields=['signature']),
+            models.Index(fields=['status']),
         ]
         ordering = ['-signed_at']
 
@@ -15,5 +15,5 @@ class SignatureSerializer(serializers.ModelSerializer):
 class SignedDocumentSerializer(serializers.ModelSerializer):
     class Meta:
         model = SignedDocument
-        fields = ['id', 'original_document', 'signature', 'signed_pdf', 'signed_at']
-        read_only_fields = ['id', 'signed_pdf', 'signed_at']
+        fields = ['id', 'original_document', 'signature', 'signed_pdf', 'status', 'signed_at']
+        read_only_fields = ['id', 'signed_pdf', 'status', 'signed_at']
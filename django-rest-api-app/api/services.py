@@ -1,13 +1,104 @@
 import os
-import tempfile
 import logging
-from typing import Optional, Tuple
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
 from django.core.files.base import ContentFile
 from django.core.exceptions import ValidationError
 import fitz  # PyMuPDF
 
 logger = logging.getLogger('api.pdf_processing')
 
+# Failures already surface as exceptions and are logged by sign_pdf; don't
+# also print them to stderr
+fitz.TOOLS.mupdf_display_errors(False)
+
+# Documents with this many pages or fewer are signed in-process; below this the
+# cost of starting worker processes outweighs the parallel speed-up.
+PARALLEL_PAGE_THRESHOLD = 4
+MAX_SIGNING_WORKERS = 4
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _init_pool_worker() -> None:
+    """
+    Pool initializer: runs once when each worker process starts, clearing
+    MuPDF warnings inherited from the parent.
+    """
+    fitz.TOOLS.mupdf_warnings(reset=True)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Return the shared signing pool, creating it on first use. The pool is
+    recreated when the current process is not the one that created it
+    (forked server workers, the dev-server reloader), since an executor
+    does not survive a fork.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=min(os.cpu_count() or 1, MAX_SIGNING_WORKERS),
+                initializer=_init_pool_worker,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def _sign_page_range(args) -> bytes:
+    """
+    Pool worker: sign pages [start, stop) of a PDF and return just those
+    pages as serialized PDF bytes.
+    """
+    pdf_path, start, stop, signature_path, position, signature_width, signature_height, margin = args
+    service = PDFSigningService(signature_width, signature_height, margin)
+
+    doc = fitz.open(pdf_path)
+    try:
+        doc.select(range(start, stop))
+        # Decode the signature once for all pages in this range
+        signature_pixmap = fitz.Pixmap(signature_path)
+        for page in doc:
+            service._sign_page(page, signature_pixmap, position)
+        signature_pixmap = None
+
+        return doc.tobytes()
+    finally:
+        doc.close()
+        # Workers are long-lived; don't let MuPDF's cache grow across jobs
+        fitz.TOOLS.store_shrink(100)
+
+
+def _can_sign_in_parallel(doc: fitz.Document) -> bool:
+    """
+    The parallel path rebuilds the document from its signed pages, which
+    loses everything stored at document level (form fields and digital
+    signatures, page labels, outlines, named destinations, ...) as well as
+    links between pages. Only take it for plain documents where nothing
+    beyond the pages and the Info metadata can be lost.
+    """
+    if doc.is_encrypted or doc.needs_pass:
+        return False
+    if set(doc.xref_get_keys(doc.pdf_catalog())) - {'Type', 'Pages'}:
+        return False
+    # Links and form widgets are page annotations
+    return all(
+        doc.xref_get_key(doc.page_xref(page_num), 'Annots')[0] == 'null'
+        for page_num in range(doc.page_count)
+    )
+
 class PDFSigningService:
     """
     Service for signing PDFs with images.
@@ -19,71 +110,133 @@ class PDFSigningService:
         self.signature_height = signature_height
         self.margin = margin
 
-    def sign_pdf(self, pdf_path: str, signature_path: str, position: Optional[Tuple[float, float]] = None) -> bytes:
+    def sign_pdf(self, pdf_path: str, signature_path: str, position: Optional[Tuple[float, float]] = None,
+                 output_path: Optional[str] = None) -> Optional[bytes]:
         """
         Sign a PDF with a signature image on every page.
 
         Args:
             pdf_path: Path to the input PDF file
             signature_path: Path to the signature image file
+            output_path: Optional path to save the signed PDF to instead of
+                returning it
 
         Returns:
-            bytes: Signed PDF content
+            bytes: Signed PDF content, or None if it was saved to ``output_path``
 
         Raises:
             ValidationError: If signing fails
         """
-        logger.info(f"Starting PDF signing: PDF={pdf_path}, Signature={signature_path}")
+        logger.info("Starting PDF signing: PDF=%s, Signature=%s", pdf_path, signature_path)
 
         doc = None
-        tmp_path = None
 
         try:
             # Open the PDF document
             doc = fitz.open(pdf_path)
-            total_pages = len(doc)
-            logger.info(f"Opened PDF with {total_pages} pages")
+            total_pages = doc.page_count
+            logger.info("Opened PDF with %d pages", total_pages)
+
+            workers = min(os.cpu_count() or 1, MAX_SIGNING_WORKERS)
+            parallel = (
+                total_pages > PARALLEL_PAGE_THRESHOLD
+                and workers > 1
+                and _can_sign_in_parallel(doc)
+            )
+
+            # When signing in place and writing to a file, append the
+            # signatures to a copy of the original as an incremental update
+            # instead of rewriting the whole PDF, so the original bytes stay
+            # intact. Documents that carry digital signatures have a form
+            # (/AcroForm) and so never take the parallel path, which keeps
+            # those signatures valid whatever the page count.
+            incremental = output_path is not None and not parallel and doc.can_save_incrementally()
+            if incremental:
+                doc.close()
+                doc = None
+                shutil.copyfile(pdf_path, output_path)
+                doc = fitz.open(output_path)
+
+            if parallel:
+                # Page insertion is CPU-bound and PyMuPDF holds the GIL, so
+                # split the pages across processes and merge the results
+                parts = self._sign_pages_parallel(pdf_path, total_pages, signature_path, position, workers)
+                signed_doc = fitz.open()
+                signed_doc.set_metadata(doc.metadata)
+                for part_bytes in parts:
+                    with fitz.open(stream=part_bytes, filetype='pdf') as part:
+                        signed_doc.insert_pdf(part)
+                doc.close()
+                doc = signed_doc
+            else:
+                # Decode the signature once instead of once per page
+                signature_pixmap = fitz.Pixmap(signature_path)
+
+                # Process each page
+                for page in doc:
+                    self._sign_page(page, signature_pixmap, position)
 
-            # Process each page
-            for page_num in range(total_pages):
-                self._sign_page(doc, page_num, signature_path, position)
-                logger.debug(f"Signed page {page_num + 1}/{total_pages}")
+                signature_pixmap = None
 
-            # Save to temporary file (ensure file is not held open on Windows)
-            fd, tmp_path = tempfile.mkstemp(suffix='.pdf')
-            os.close(fd)
-            doc.save(tmp_path)
+            if incremental:
+                doc.save(output_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP, deflate=True)
+                logger.info("PDF signing completed successfully (incremental), output size: %d bytes", os.path.getsize(output_path))
+                return None
 
-            # Read the signed PDF content
-            with open(tmp_path, 'rb') as f:
-                signed_content = f.read()
+            # garbage=4 also merges duplicate objects, e.g. the signature
+            # image copied in by each pool worker
+            if output_path is not None:
+                doc.save(output_path, garbage=4, deflate=True)
+                logger.info("PDF signing completed successfully, output size: %d bytes", os.path.getsize(output_path))
+                return None
 
-            logger.info(f"PDF signing completed successfully, output size: {len(signed_content)} bytes")
+            signed_content = doc.tobytes(garbage=4, deflate=True)
+
+            logger.info("PDF signing completed successfully, output size: %d bytes", len(signed_content))
             return signed_content
 
         except Exception as e:
-            logger.error(f"PDF signing failed: {str(e)}")
+            logger.error("PDF signing failed: %s", e)
             raise ValidationError(f"Failed to sign PDF: {str(e)}")
 
         finally:
             # Cleanup resources
-            if tmp_path and os.path.exists(tmp_path):
-                try:
-                    os.unlink(tmp_path)
-                except OSError:
-                    logger.warning(f"Failed to cleanup temporary file: {tmp_path}")
-
             if doc:
                 try:
                     doc.close()
                 except Exception:
                     logger.warning("Failed to close PDF document")
 
-    def _sign_page(self, doc, page_num: int, signature_path: str, position: Optional[Tuple[float, float]] = None) -> None:
+            # Drop everything MuPDF cached for this document, so long-running
+            # server processes don't grow with every request
+            fitz.TOOLS.store_shrink(100)
+
+    def _sign_pages_parallel(self, pdf_path: str, total_pages: int, signature_path: str,
+                             position: Optional[Tuple[float, float]], workers: int) -> List[bytes]:
+        """
+        Sign the pages of a PDF across a process pool, one contiguous page
+        range per worker. Returns the signed page ranges as PDF bytes, in
+        page order.
+        """
+        chunk = -(-total_pages // workers)
+        tasks = [
+            (pdf_path, start, min(start + chunk, total_pages), signature_path, position,
+             self.signature_width, self.signature_height, self.margin)
+            for start in range(0, total_pages, chunk)
+        ]
+        logger.info("Signing %d pages across %d worker processes", total_pages, len(tasks))
+
+        try:
+            return list(_get_pool().map(_sign_page_range, tasks))
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next job
+            _reset_pool()
+            raise
+
+    def _sign_page(self, page: fitz.Page, signature_pixmap: fitz.Pixmap, position: Optional[Tuple[float, float]] = None) -> None:
         """
         Sign a single page with the signature image.
         """
-        page = doc.load_page(page_num)
         page_rect = page.rect
 
         # Calculate position
@@ -105,4 +258,4 @@ class PDFSigningService:
 
         # Insert signature
         rect = fitz.Rect(x, y, x + self.signature_width, y + self.signature_height)
-        page.insert_image(rect, filename=signature_path, keep_proportion=True)
+        page.insert_image(rect, pixmap=signature_pixmap, keep_proportion=True)
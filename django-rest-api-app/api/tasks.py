@@ -0,0 +1,112 @@
+import os
+import tempfile
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from django.core.files import File
+from django.db import close_old_connections
+from .models import SignedDocument
+from .services import PDFSigningService
+
+logger = logging.getLogger('api.pdf_processing')
+
+# Signing jobs run outside the request/response cycle. Large documents are
+# additionally split across processes by PDFSigningService itself.
+MAX_SIGNING_JOBS = 2
+
+# Write the signed PDF to tmpfs when available, so MuPDF's many small writes
+# are memory copies rather than block I/O. /dev/shm is often small (64 MB in
+# a default Docker container), so jobs that may not fit fall back to the
+# default temp dir; see _signing_tmp_dir().
+SIGNING_TMP_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+_executor = ThreadPoolExecutor(max_workers=MAX_SIGNING_JOBS, thread_name_prefix='pdf-signing')
+
+
+def enqueue_sign_pdf(signed_document_id, position: Optional[Tuple[float, float]] = None) -> None:
+    """
+    Queue a pending SignedDocument for signing in the background.
+    Call this after the row has been committed.
+    """
+    future = _executor.submit(sign_pdf_task, signed_document_id, position)
+    future.add_done_callback(_log_task_exception)
+
+
+def _log_task_exception(future) -> None:
+    # Nobody waits on the future, so an exception escaping sign_pdf_task
+    # (e.g. a lost database connection) would otherwise go unnoticed
+    if future.cancelled():
+        return
+    exc = future.exception()
+    if exc is not None:
+        logger.error("Signing task crashed: %s", exc, exc_info=exc)
+
+
+def _signing_tmp_dir(pdf_path: str) -> Optional[str]:
+    """
+    Return SIGNING_TMP_DIR if it has room for signing ``pdf_path``, or None
+    for the default temp dir. The signed copy is about the size of the
+    original; twice that leaves headroom for a concurrent job.
+    """
+    if SIGNING_TMP_DIR is None:
+        return None
+    try:
+        stats = os.statvfs(SIGNING_TMP_DIR)
+        needed = 2 * os.path.getsize(pdf_path)
+    except OSError:
+        return None
+    if stats.f_bavail * stats.f_frsize < needed:
+        logger.info("Not enough space in %s, signing in the default temp dir", SIGNING_TMP_DIR)
+        return None
+    return SIGNING_TMP_DIR
+
+
+def sign_pdf_task(signed_document_id, position: Optional[Tuple[float, float]] = None) -> None:
+    """
+    Sign the original PDF of a pending SignedDocument, store the result and
+    mark the row as completed (or failed).
+    """
+    close_old_connections()
+    try:
+        try:
+            signed_document = SignedDocument.objects.select_related(
+                'original_document', 'signature'
+            ).get(pk=signed_document_id)
+        except SignedDocument.DoesNotExist:
+            logger.warning("Signed document %s was deleted before it could be signed", signed_document_id)
+            return
+
+        original_document = signed_document.original_document
+        try:
+            # MuPDF writes the result straight to a file and the storage backend
+            # copies it from there in chunks, so the PDF is never held in memory
+            pdf_path = original_document.get_file_path()
+            with tempfile.TemporaryDirectory(dir=_signing_tmp_dir(pdf_path)) as tmp_dir:
+                signed_path = os.path.join(tmp_dir, f"signed_{original_document.id}.pdf")
+                PDFSigningService().sign_pdf(
+                    pdf_path,
+                    signed_document.signature.get_file_path(),
+                    position=position,
+                    output_path=signed_path
+                )
+
+                with open(signed_path, 'rb') as signed_file:
+                    signed_document.signed_pdf.save(os.path.basename(signed_path), File(signed_file), save=False)
+        except Exception as e:
+            logger.error("Signing failed for signed document %s: %s", signed_document_id, e)
+            SignedDocument.objects.filter(pk=signed_document_id).update(status=SignedDocument.STATUS_FAILED)
+            return
+
+        # update() rather than save(): the row may have been deleted while
+        # the PDF was being signed
+        updated = SignedDocument.objects.filter(pk=signed_document_id).update(
+            signed_pdf=signed_document.signed_pdf.name,
+            status=SignedDocument.STATUS_COMPLETED,
+        )
+        if not updated:
+            logger.warning("Signed document %s was deleted while it was being signed", signed_document_id)
+            signed_document.signed_pdf.delete(save=False)
+            return
+        logger.info("Signed document %s completed successfully", signed_document_id)
+    finally:
+        close_old_connections()
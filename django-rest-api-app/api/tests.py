@@ -1,16 +1,342 @@
-from django.test import TestCase
-from .models import YourModel  # Replace with your actual model
+import io
+import os
+import tempfile
+from concurrent.futures import Future
+from datetime import timedelta
+from unittest import mock
+import fitz  # PyMuPDF
+from PIL import Image
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from .models import Document, Signature, SignedDocument
+from .services import PDFSigningService
+from .tasks import _log_task_exception, _signing_tmp_dir, sign_pdf_task
+from .validators import validate_image_dimensions, validate_image_file, validate_pdf_file
 
-class YourModelTests(TestCase):
+class PDFSigningServiceTests(SimpleTestCase):
     def setUp(self):
-        # Set up any initial data for your tests here
-        self.instance = YourModel.objects.create(field1='value1', field2='value2')  # Adjust fields as necessary
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
 
-    def test_model_creation(self):
-        self.assertEqual(self.instance.field1, 'value1')
-        self.assertEqual(self.instance.field2, 'value2')
+        self.pdf_path = os.path.join(self.tmp_dir, 'original.pdf')
+        with fitz.open() as doc:
+            for page_num in range(2):
+                doc.new_page().insert_text((72, 72), f"Page {page_num + 1}")
+            doc.save(self.pdf_path)
 
-    def test_model_str(self):
-        self.assertEqual(str(self.instance), 'Expected String Representation')  # Adjust as necessary
+        self.signature_path = os.path.join(self.tmp_dir, 'signature.png')
+        Image.new('RGBA', (300, 150), (0, 0, 255, 128)).save(self.signature_path)
 
-    # Add more tests as needed for your application logic
\ No newline at end of file
+    def assertSignedEveryPage(self, doc, page_count=2):
+        self.assertEqual(doc.page_count, page_count)
+        for page in doc:
+            self.assertEqual(len(page.get_images()), 1)
+
+    def test_sign_pdf_returns_signed_bytes(self):
+        signed_content = PDFSigningService().sign_pdf(self.pdf_path, self.signature_path)
+
+        with fitz.open(stream=signed_content, filetype='pdf') as doc:
+            self.assertSignedEveryPage(doc)
+
+    def test_sign_pdf_to_file_appends_incremental_update(self):
+        output_path = os.path.join(self.tmp_dir, 'signed.pdf')
+
+        result = PDFSigningService().sign_pdf(self.pdf_path, self.signature_path, output_path=output_path)
+
+        self.assertIsNone(result)
+        with open(self.pdf_path, 'rb') as f:
+            original_content = f.read()
+        with open(output_path, 'rb') as f:
+            signed_content = f.read()
+        # The original bytes are kept as-is, with the signatures appended
+        self.assertTrue(signed_content.startswith(original_content))
+        self.assertGreater(len(signed_content), len(original_content))
+        with fitz.open(output_path) as doc:
+            self.assertSignedEveryPage(doc)
+            self.assertEqual(doc[1].get_text().strip(), 'Page 2')
+
+    def _make_pdf(self, page_count, form=False):
+        path = os.path.join(self.tmp_dir, f'original_{page_count}.pdf')
+        with fitz.open() as doc:
+            for page_num in range(page_count):
+                doc.new_page().insert_text((72, 72), f"Page {page_num + 1}")
+            if form:
+                widget = fitz.Widget()
+                widget.field_name = 'name'
+                widget.field_type = fitz.PDF_WIDGET_TYPE_TEXT
+                widget.rect = fitz.Rect(72, 100, 272, 120)
+                doc[0].add_widget(widget)
+                doc[0].insert_link({'kind': fitz.LINK_GOTO, 'from': fitz.Rect(72, 150, 172, 170), 'page': page_count - 1})
+                doc.set_page_labels([{'startpage': 0, 'prefix': 'A-', 'style': 'D', 'firstpagenum': 1}])
+            doc.save(path)
+        return path
+
+    @mock.patch('api.services.os.cpu_count', return_value=4)
+    def test_sign_pdf_across_processes(self, cpu_count):
+        pdf_path = self._make_pdf(10)
+
+        signed_content = PDFSigningService().sign_pdf(pdf_path, self.signature_path)
+
+        with fitz.open(stream=signed_content, filetype='pdf') as doc:
+            self.assertSignedEveryPage(doc, page_count=10)
+            self.assertEqual(doc[9].get_text().strip(), 'Page 10')
+
+    @mock.patch('api.services.os.cpu_count', return_value=4)
+    def test_sign_pdf_keeps_document_structure(self, cpu_count):
+        pdf_path = self._make_pdf(10, form=True)
+        output_path = os.path.join(self.tmp_dir, 'signed.pdf')
+
+        signed_content = PDFSigningService().sign_pdf(pdf_path, self.signature_path)
+        PDFSigningService().sign_pdf(pdf_path, self.signature_path, output_path=output_path)
+
+        for doc in (fitz.open(stream=signed_content, filetype='pdf'), fitz.open(output_path)):
+            with doc:
+                self.assertSignedEveryPage(doc, page_count=10)
+                self.assertTrue(doc.is_form_pdf)
+                self.assertEqual([w.field_name for w in doc[0].widgets()], ['name'])
+                self.assertEqual([link['page'] for link in doc[0].get_links()], [9])
+                self.assertEqual(doc[9].get_label(), 'A-10')
+
+        # Signed in place, so the file output is still an incremental update
+        with open(pdf_path, 'rb') as f:
+            original_content = f.read()
+        with open(output_path, 'rb') as f:
+            self.assertTrue(f.read().startswith(original_content))
+
+
+class PDFValidatorTests(SimpleTestCase):
+    def test_accepts_header_after_leading_bytes(self):
+        upload = SimpleUploadedFile('document.pdf', b'\r\n' + b' ' * 500 + b'%PDF-1.7\n')
+
+        validate_pdf_file(upload)
+
+        self.assertEqual(upload.tell(), 0)
+
+    def test_rejects_missing_header(self):
+        for content in (b'not a pdf', b' ' * 1024 + b'%PDF-1.7\n'):
+            with self.assertRaises(ValidationError):
+                validate_pdf_file(SimpleUploadedFile('document.pdf', content))
+
+
+class ImageValidatorTests(SimpleTestCase):
+    def make_image(self, size=(300, 150), name='signature.png'):
+        image = io.BytesIO()
+        Image.new('RGB', size).save(image, format='PNG')
+        return SimpleUploadedFile(name, image.getvalue(), content_type='image/png')
+
+    def test_validators_can_run_repeatedly(self):
+        upload = self.make_image()
+
+        for validator in (validate_image_file, validate_image_file, validate_image_dimensions, validate_image_dimensions):
+            validator(upload)
+
+        self.assertEqual(upload.tell(), 0)
+
+    def test_rejects_invalid_image(self):
+        upload = SimpleUploadedFile('signature.png', b'not an image', content_type='image/png')
+
+        with self.assertRaises(ValidationError):
+            validate_image_file(upload)
+        with self.assertRaises(ValidationError):
+            validate_image_dimensions(upload)
+
+    def test_rejects_oversized_image(self):
+        upload = self.make_image(size=(2500, 100))
+
+        validate_image_file(upload)
+        with self.assertRaises(ValidationError):
+            validate_image_dimensions(upload)
+
+
+class MediaTestCase(TestCase):
+    """
+    Stores uploads in a temporary MEDIA_ROOT and creates a one-page
+    Document and a Signature to work with.
+    """
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.media_root = tmp_dir.name
+        media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.document = self.create_document()
+        self.signature = self.create_signature()
+
+    def create_document(self):
+        with fitz.open() as doc:
+            doc.new_page().insert_text((72, 72), "Page 1")
+            pdf_content = doc.tobytes()
+        return Document.objects.create(
+            original_pdf=ContentFile(pdf_content, name='original.pdf'),
+            file_size=len(pdf_content),
+            page_count=1,
+        )
+
+    def create_signature(self):
+        image = io.BytesIO()
+        Image.new('RGBA', (300, 150), (0, 0, 255, 128)).save(image, format='PNG')
+        return Signature.objects.create(image_file=ContentFile(image.getvalue(), name='signature.png'))
+
+    def create_signed_document(self, **kwargs):
+        return SignedDocument.objects.create(original_document=self.document, signature=self.signature, **kwargs)
+
+    def media_files(self, subdir):
+        path = os.path.join(self.media_root, subdir)
+        return os.listdir(path) if os.path.isdir(path) else []
+
+
+class SignedDocumentSigningTests(MediaTestCase):
+    def test_create_queues_signing_and_returns_202(self):
+        with mock.patch('api.views.enqueue_sign_pdf') as enqueue_sign_pdf:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                response = self.client.post('/api/signed-documents/', {
+                    'original_document': self.document.id,
+                    'signature': self.signature.id,
+                })
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], SignedDocument.STATUS_PENDING)
+        self.assertEqual(len(callbacks), 1)
+        signed_document = SignedDocument.objects.get()
+        enqueue_sign_pdf.assert_called_once_with(signed_document.id, None)
+
+    def test_download_while_pending_returns_404(self):
+        signed_document = self.create_signed_document()
+
+        response = self.client.get(f'/api/signed-documents/{signed_document.id}/download/')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_sign_pdf_task_completes_signed_document(self):
+        signed_document = self.create_signed_document()
+
+        sign_pdf_task(signed_document.id)
+
+        signed_document.refresh_from_db()
+        self.assertEqual(signed_document.status, SignedDocument.STATUS_COMPLETED)
+        with fitz.open(signed_document.get_file_path()) as doc:
+            self.assertEqual(len(doc[0].get_images()), 1)
+        response = self.client.get(f'/api/signed-documents/{signed_document.id}/download/')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    @mock.patch('api.tasks.PDFSigningService.sign_pdf', side_effect=ValidationError("Failed to sign PDF"))
+    def test_sign_pdf_task_marks_failure(self, sign_pdf):
+        signed_document = self.create_signed_document()
+
+        with self.assertLogs('api.pdf_processing', level='ERROR'):
+            sign_pdf_task(signed_document.id)
+
+        signed_document.refresh_from_db()
+        self.assertEqual(signed_document.status, SignedDocument.STATUS_FAILED)
+        self.assertFalse(signed_document.signed_pdf)
+
+    def test_sign_pdf_task_removes_file_when_row_deleted(self):
+        signed_document = self.create_signed_document()
+
+        def sign_and_delete(pdf_path, signature_path, position=None, output_path=None):
+            with open(pdf_path, 'rb') as src, open(output_path, 'wb') as dst:
+                dst.write(src.read())
+            SignedDocument.objects.filter(pk=signed_document.pk).delete()
+
+        with mock.patch('api.tasks.PDFSigningService.sign_pdf', side_effect=sign_and_delete):
+            with self.assertLogs('api.pdf_processing', level='WARNING'):
+                sign_pdf_task(signed_document.id)
+
+        self.assertFalse(SignedDocument.objects.exists())
+        self.assertEqual(self.media_files('signed_documents'), [])
+
+    @mock.patch('api.tasks.SIGNING_TMP_DIR', '/dev/shm')
+    def test_signing_tmp_dir_falls_back_when_full(self):
+        pdf_path = self.document.get_file_path()
+        pdf_size = os.path.getsize(pdf_path)
+
+        with mock.patch('api.tasks.os.statvfs', return_value=mock.Mock(f_bavail=2 * pdf_size, f_frsize=1)):
+            self.assertEqual(_signing_tmp_dir(pdf_path), '/dev/shm')
+        with mock.patch('api.tasks.os.statvfs', return_value=mock.Mock(f_bavail=pdf_size, f_frsize=1)):
+            self.assertIsNone(_signing_tmp_dir(pdf_path))
+
+    def test_task_exception_is_logged(self):
+        future = Future()
+        future.set_exception(RuntimeError("connection lost"))
+
+        with self.assertLogs('api.pdf_processing', level='ERROR') as logs:
+            _log_task_exception(future)
+
+        self.assertIn("connection lost", logs.output[0])
+
+    def test_cleanup_fails_stale_pending_jobs(self):
+        stale = self.create_signed_document()
+        fresh = self.create_signed_document()
+        SignedDocument.objects.filter(pk=stale.pk).update(signed_at=timezone.now() - timedelta(hours=2))
+
+        call_command('cleanup_signed_pdfs')
+
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stale.status, SignedDocument.STATUS_FAILED)
+        self.assertEqual(fresh.status, SignedDocument.STATUS_PENDING)
+
+
+class CleanupOldRecordsTests(MediaTestCase):
+    def create_completed(self, document=None, signature=None):
+        return SignedDocument.objects.create(
+            original_document=document or self.document,
+            signature=signature or self.signature,
+            signed_pdf=ContentFile(b'%PDF-1.7', name='signed.pdf'),
+            status=SignedDocument.STATUS_COMPLETED,
+        )
+
+    def expire(self, obj):
+        old = timezone.now() - timedelta(days=4)
+        field = 'signed_at' if isinstance(obj, SignedDocument) else 'created_at'
+        type(obj).objects.filter(pk=obj.pk).update(**{field: old})
+
+    def assertCleanedUp(self):
+        expired_document = self.create_document()
+        expired_signature = self.create_signature()
+        self.expire(expired_document)
+        self.expire(expired_signature)
+        # Recent signed documents of an expired Document or Signature go too
+        child_of_document = self.create_completed(document=expired_document)
+        child_of_signature = self.create_completed(signature=expired_signature)
+        expired_signed = self.create_completed()
+        self.expire(expired_signed)
+        fresh_signed = self.create_completed()
+        removed_paths = [
+            expired_document.get_file_path(),
+            expired_signature.get_file_path(),
+            child_of_document.get_file_path(),
+            child_of_signature.get_file_path(),
+            expired_signed.get_file_path(),
+        ]
+        kept_paths = [
+            self.document.get_file_path(),
+            self.signature.get_file_path(),
+            fresh_signed.get_file_path(),
+        ]
+
+        call_command('cleanup_old_records')
+
+        self.assertQuerySetEqual(Document.objects.all(), [self.document])
+        self.assertQuerySetEqual(Signature.objects.all(), [self.signature])
+        self.assertQuerySetEqual(SignedDocument.objects.all(), [fresh_signed])
+        for path in removed_paths:
+            self.assertFalse(os.path.exists(path), path)
+        for path in kept_paths:
+            self.assertTrue(os.path.exists(path), path)
+
+    def test_cleanup_with_delete_returning(self):
+        self.assertCleanedUp()
+
+    @mock.patch('api.management.commands.cleanup_old_records._can_delete_returning', return_value=False)
+    def test_cleanup_without_delete_returning(self, can_delete_returning):
+        self.assertCleanedUp()
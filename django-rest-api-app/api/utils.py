@@ -0,0 +1,55 @@
+import os
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger('api.cleanup')
+
+# unlinkat() is unavailable on Windows
+_HAS_DIR_FD = os.unlink in os.supports_dir_fd
+
+
+def remove_files(paths):
+    """
+    Remove the given files, ignoring ones that no longer exist.
+
+    Paths are grouped by parent directory and each directory is opened once,
+    so every unlink is relative to the directory fd instead of a full path
+    lookup.
+    """
+    names_by_dir = defaultdict(list)
+    for path in paths:
+        if path:
+            parent, name = os.path.split(path)
+            names_by_dir[parent].append(name)
+
+    for parent, names in names_by_dir.items():
+        if not _HAS_DIR_FD:
+            for name in names:
+                _unlink(parent, name)
+            continue
+
+        try:
+            dir_fd = os.open(parent, os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            logger.warning("Failed to open directory %s: %s", parent, e)
+            continue
+        try:
+            for name in names:
+                _unlink(parent, name, dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def _unlink(parent, name, dir_fd=None):
+    # No exists() pre-check: a missing file is reported by unlink itself
+    try:
+        if dir_fd is None:
+            os.unlink(os.path.join(parent, name))
+        else:
+            os.unlink(name, dir_fd=dir_fd)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning("Failed to remove file %s: %s", os.path.join(parent, name), e)
@@ -1,7 +1,13 @@
 from django.core.exceptions import ValidationError
 import mimetypes
+import os
 from PIL import Image
 
+_PDF_MAGIC = b'%PDF-'
+# Readers accept the header anywhere in the first 1024 bytes
+_PDF_HEADER_WINDOW = 1024
+_IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.bmp'})
+
 def validate_pdf_file(value):
     """
     Validate that the uploaded file is a PDF.
@@ -9,9 +15,11 @@ def validate_pdf_file(value):
     if not value.name.lower().endswith('.pdf'):
         raise ValidationError('File must be a PDF.')
 
-    # Check MIME type for additional validation
-    mime_type, _ = mimetypes.guess_type(value.name)
-    if mime_type != 'application/pdf':
+    # Check the file header rather than trusting the name
+    value.seek(0)
+    header = value.read(_PDF_HEADER_WINDOW)
+    value.seek(0)
+    if _PDF_MAGIC not in header:
         raise ValidationError('File must be a PDF.')
 
 def validate_file_size(value):
@@ -26,8 +34,7 @@ def validate_image_file(value):
     """
     Validate that the uploaded file is an image.
     """
-    valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp']
-    if not any(value.name.lower().endswith(ext) for ext in valid_extensions):
+    if os.path.splitext(value.name)[1].lower() not in _IMAGE_EXTENSIONS:
         raise ValidationError('File must be an image (jpg, jpeg, png, gif, bmp).')
 
     # Check MIME type
@@ -35,16 +42,39 @@ def validate_image_file(value):
     if not mime_type or not mime_type.startswith('image/'):
         raise ValidationError('File must be an image.')
 
+    # Check the content is a readable image
+    try:
+        _verified_image_size(value)
+    except Exception:
+        raise ValidationError('Invalid image file.')
+
 def validate_image_dimensions(value):
     """
     Validate image dimensions (max 2000x2000 pixels).
     """
     try:
-        img = Image.open(value)
-        width, height = img.size
-        max_dimension = 2000
-        if width > max_dimension or height > max_dimension:
-            raise ValidationError(f'Image dimensions must be less than {max_dimension}x{max_dimension} pixels.')
-        img.close()
+        width, height = _verified_image_size(value)
     except Exception:
-        raise ValidationError('Invalid image file or unable to read dimensions.')
\ No newline at end of file
+        raise ValidationError('Invalid image file or unable to read dimensions.')
+
+    max_dimension = 2000
+    if width > max_dimension or height > max_dimension:
+        raise ValidationError(f'Image dimensions must be less than {max_dimension}x{max_dimension} pixels.')
+
+def _verified_image_size(value):
+    """
+    Open and verify the uploaded image once and cache its size on the file,
+    so the image validators share a single parse. Only the size is cached:
+    a PIL image can't be used after verify().
+    """
+    size = getattr(value, '_verified_image_size', None)
+    if size is None:
+        value.seek(0)
+        try:
+            with Image.open(value) as img:
+                size = img.size
+                img.verify()
+        finally:
+            value.seek(0)
+        value._verified_image_size = size
+    return size
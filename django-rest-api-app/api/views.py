@@ -7,14 +7,36 @@ from django.db import transaction
 from django.http import FileResponse
 from .models import Document, Signature, SignedDocument
 from .serializers import DocumentSerializer, SignatureSerializer, SignedDocumentSerializer
-from .services import PDFSigningService
-from pypdf import PdfReader
-from django.core.files.base import ContentFile
+from .tasks import enqueue_sign_pdf
+import fitz  # PyMuPDF
+import io
 import logging
 import os
 
 logger = logging.getLogger('api.views')
 
+def _get_page_count(pdf_file):
+    """
+    Get the page count of an uploaded PDF without copying the upload.
+    MuPDF only reads the xref and page tree, not the page contents.
+    """
+    if hasattr(pdf_file, 'temporary_file_path'):
+        # Large uploads are already spooled to disk
+        with fitz.open(pdf_file.temporary_file_path()) as pdf:
+            return pdf.page_count
+
+    if isinstance(pdf_file.file, io.BytesIO):
+        # In-memory uploads: let MuPDF read the upload buffer in place
+        with pdf_file.file.getbuffer() as buffer:
+            with fitz.open(stream=buffer, filetype='pdf') as pdf:
+                return pdf.page_count
+
+    try:
+        with fitz.open(stream=pdf_file.read(), filetype='pdf') as pdf:
+            return pdf.page_count
+    finally:
+        pdf_file.seek(0)
+
 class DocumentViewSet(viewsets.ModelViewSet):
     queryset = Document.objects.all()
     serializer_class = DocumentSerializer
@@ -22,32 +44,31 @@ class DocumentViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         pdf_file = serializer.validated_data['original_pdf']
 
-        logger.info(f"Processing document upload: {pdf_file.name}")
+        logger.info("Processing document upload: %s", pdf_file.name)
 
         try:
             # Extract page count
-            reader = PdfReader(pdf_file)
-            page_count = len(reader.pages)
-            logger.info(f"Extracted {page_count} pages from {pdf_file.name}")
+            page_count = _get_page_count(pdf_file)
+            logger.info("Extracted %d pages from %s", page_count, pdf_file.name)
         except Exception as e:
-            logger.error(f"Failed to extract page count from {pdf_file.name}: {str(e)}")
+            logger.error("Failed to extract page count from %s: %s", pdf_file.name, e)
             page_count = 0
 
         # Get file size
         file_size = pdf_file.size
-        logger.info(f"Document {pdf_file.name} size: {file_size} bytes")
+        logger.info("Document %s size: %d bytes", pdf_file.name, file_size)
 
         serializer.save(file_size=file_size, page_count=page_count)
-        logger.info(f"Document {serializer.instance.id} saved successfully")
+        logger.info("Document %s saved successfully", serializer.instance.id)
 
 class SignatureViewSet(viewsets.ModelViewSet):
     queryset = Signature.objects.all()
     serializer_class = SignatureSerializer
 
     def perform_create(self, serializer):
-        logger.info(f"Processing signature upload: {serializer.validated_data['image_file'].name}")
+        logger.info("Processing signature upload: %s", serializer.validated_data['image_file'].name)
         serializer.save()
-        logger.info(f"Signature {serializer.instance.id} saved successfully")
+        logger.info("Signature %s saved successfully", serializer.instance.id)
 
 class SignedDocumentViewSet(viewsets.ModelViewSet):
     queryset = SignedDocument.objects.all()
@@ -57,40 +78,36 @@ class SignedDocumentViewSet(viewsets.ModelViewSet):
         original_document = serializer.validated_data['original_document']
         signature = serializer.validated_data['signature']
 
-        logger.info(f"Starting PDF signing for document {original_document.id} with signature {signature.id}")
+        logger.info("Queueing PDF signing for document %s with signature %s", original_document.id, signature.id)
 
-        # Use transaction for atomicity
-        with transaction.atomic():
-            # Sign the PDF
-            signing_service = PDFSigningService()
-            # Optional relative position (0..1) from top-left
-            position_x = self.request.data.get('position_x', None)
-            position_y = self.request.data.get('position_y', None)
+        # Optional relative position (0..1) from top-left
+        position_x = self.request.data.get('position_x', None)
+        position_y = self.request.data.get('position_y', None)
+        position = None
+        try:
+            if position_x is not None and position_y is not None:
+                position = (float(position_x), float(position_y))
+        except (TypeError, ValueError):
             position = None
-            try:
-                if position_x is not None and position_y is not None:
-                    position = (float(position_x), float(position_y))
-            except (TypeError, ValueError):
-                position = None
-            signed_content = signing_service.sign_pdf(
-                original_document.get_file_path(),
-                signature.get_file_path(),
-                position=position
-            )
-
-            # Create the signed document
-            signed_pdf_file = ContentFile(
-                signed_content,
-                name=f"signed_{original_document.id}.pdf"
-            )
-
-            serializer.save(signed_pdf=signed_pdf_file)
-            logger.info(f"Signed document {serializer.instance.id} created successfully")
+
+        # The PDF is signed in the background; the worker only sees the row
+        # once it has been committed
+        with transaction.atomic():
+            signed_document = serializer.save(status=SignedDocument.STATUS_PENDING)
+            transaction.on_commit(lambda: enqueue_sign_pdf(signed_document.id, position))
+        logger.info("Signed document %s queued for signing", signed_document.id)
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        # Signing has only been queued; clients poll the detail endpoint
+        # until status is "completed"
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
 
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
         instance = self.get_object()
-        if not instance.signed_pdf:
+        if instance.status != SignedDocument.STATUS_COMPLETED or not instance.signed_pdf:
             return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
         
         file_handle = instance.signed_pdf.open()
@@ -106,12 +123,15 @@ class SignedPDFDeleteView(APIView):
         except SignedDocument.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
-        file_path = signed_document.get_file_path()
-        if file_path and os.path.exists(file_path):
+        # Pending or failed rows have no file yet
+        file_path = signed_document.get_file_path() if signed_document.signed_pdf else None
+        if file_path:
             try:
                 os.remove(file_path)
-            except OSError:
+            except FileNotFoundError:
                 pass
+            except OSError as e:
+                logger.warning("Failed to remove signed PDF %s: %s", file_path, e)
 
         signed_document.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)